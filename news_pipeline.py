@@ -1,11 +1,13 @@
+import asyncio
+import hashlib
+import json
 import logging
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
+from selectolax.lexbor import LexborHTMLParser
 from datetime import datetime, timezone
 import sqlite3
 import csv
 import os
-from tabulate import tabulate
 
 # ---------- Logging Setup ----------
 LOG_FILE = 'news_pipeline.log'
@@ -31,50 +33,225 @@ USER_AGENT_HEADER = {
 }
 CSV_FILE = 'articles.csv'
 DB_FILE = 'news.db'
+# Stop reading a response once it exceeds this many bytes; both pages
+# are well under this, so anything larger is not worth parsing.
+MAX_RESPONSE_BYTES = 10 * 1024 * 1024
+# On-disk cache of fetched pages, revalidated with ETag/Last-Modified.
+HTTP_CACHE_DIR = '.http_cache'
+
+# CSS selectors used by the scrapers, defined once at import time.
+SKIFT_BLOCK_SELECTOR = 'article'
+SKIFT_LINK_SELECTOR = 'a[href]'
+SKIFT_TITLE_SELECTOR = 'h2, h3'
+SKIFT_TIME_SELECTOR = 'time'
+PHOCUSWIRE_BLOCK_SELECTOR = '.list-view .item'
+PHOCUSWIRE_TITLE_SELECTOR = 'a.title'
+PHOCUSWIRE_DATE_SELECTOR = '.author'
+
+MONTH_NUMBERS = {
+    'January': 1, 'February': 2, 'March': 3, 'April': 4,
+    'May': 5, 'June': 6, 'July': 7, 'August': 8,
+    'September': 9, 'October': 10, 'November': 11, 'December': 12
+}
+
+# ---------- Timestamp Helpers ----------
+def format_iso_timestamp(raw_dt):
+    """
+    Normalize an ISO-8601 datetime attribute to 'YYYY-MM-DD HH:MM:SS'
+    using string operations only, avoiding a parse/format round trip.
+
+    Args:
+        raw_dt (str): Raw datetime attribute value, e.g. '2025-07-19T11:05:49Z'.
+
+    Returns:
+        str: The normalized timestamp.
+
+    Raises:
+        ValueError: If the value does not look like an ISO timestamp.
+    """
+    candidate = raw_dt.replace('T', ' ')[:19]
+    if len(candidate) == 19 and candidate[4] == '-' and candidate[10] == ' ' and candidate[13] == ':':
+        return candidate
+    raise ValueError(f"Not an ISO timestamp: {raw_dt!r}")
+
+def format_phocuswire_date(raw_date):
+    """
+    Convert a PhocusWire date like 'July 19, 2025' to 'YYYY-MM-DD 00:00:00'
+    via a month-name lookup instead of strptime.
+
+    Args:
+        raw_date (str): Date text from the article byline.
+
+    Returns:
+        str: The normalized timestamp.
+
+    Raises:
+        ValueError: If the value does not match the expected format.
+    """
+    try:
+        month_name, day, year = raw_date.replace(',', '').split()
+        return f"{int(year):04d}-{MONTH_NUMBERS[month_name]:02d}-{int(day):02d} 00:00:00"
+    except (KeyError, ValueError) as e:
+        raise ValueError(f"Not a PhocusWire date: {raw_date!r}") from e
+
+# ---------- HTTP Cache Helpers ----------
+def _cache_paths(url):
+    """
+    Map a URL to its cached body and metadata file paths.
+
+    Args:
+        url (str): URL being cached.
+
+    Returns:
+        tuple: (body_path, meta_path) inside HTTP_CACHE_DIR.
+    """
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return (os.path.join(HTTP_CACHE_DIR, key + '.html'),
+            os.path.join(HTTP_CACHE_DIR, key + '.json'))
+
+def _load_cached_response(url):
+    """
+    Load the cached body and validators for a URL, if present.
+
+    Args:
+        url (str): URL to look up.
+
+    Returns:
+        tuple: (body bytes or None, metadata dict with 'etag' and
+                'last_modified' keys, possibly empty).
+    """
+    body_path, meta_path = _cache_paths(url)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            return f.read(), meta
+    except (OSError, ValueError):
+        return None, {}
+
+def _save_cached_response(url, body, meta):
+    """
+    Persist a response body and its validators for later revalidation.
+
+    Args:
+        url (str): URL the body came from.
+        body (bytes): Raw response body.
+        meta (dict): Validator headers ('etag', 'last_modified').
+    """
+    body_path, meta_path = _cache_paths(url)
+    try:
+        os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+        with open(body_path, 'wb') as f:
+            f.write(body)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    except OSError as e:
+        log.warning(f"Could not cache response for {url}: {e}")
+
+# ---------- HTTP Fetch Helper ----------
+async def fetch(session, url):
+    """
+    Fetch the raw body of a URL using a shared aiohttp session.
+
+    Responses are cached on disk and revalidated with If-None-Match /
+    If-Modified-Since; a 304 reply reuses the cached body without
+    transferring the page again. The body is streamed in chunks rather
+    than buffered by aiohttp in one go, so an unexpectedly large page is
+    cut off at MAX_RESPONSE_BYTES instead of being held in memory whole.
+
+    Args:
+        session (aiohttp.ClientSession): Session shared across scrapers.
+        url (str): URL to fetch.
+
+    Returns:
+        bytes: The raw response body.
+    """
+    cached_body, cached_meta = _load_cached_response(url)
+    conditional_headers = {}
+    if cached_body is not None:
+        if cached_meta.get('etag'):
+            conditional_headers['If-None-Match'] = cached_meta['etag']
+        if cached_meta.get('last_modified'):
+            conditional_headers['If-Modified-Since'] = cached_meta['last_modified']
+
+    async with session.get(url, headers=conditional_headers,
+                           timeout=aiohttp.ClientTimeout(total=10)) as resp:
+        if resp.status == 304 and cached_body is not None:
+            log.info(f"Cache hit (304 Not Modified) for {url}.")
+            return cached_body
+        resp.raise_for_status()
+        body = bytearray()
+        truncated = False
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            body.extend(chunk)
+            if len(body) > MAX_RESPONSE_BYTES:
+                log.warning(f"Response from {url} exceeded {MAX_RESPONSE_BYTES} bytes; truncating.")
+                truncated = True
+                break
+        body = bytes(body)
+        meta = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified')
+        }
+        # Never cache a truncated body: the validators describe the full
+        # page, so a later 304 would serve the cut-off copy forever.
+        if not truncated and (meta['etag'] or meta['last_modified']):
+            _save_cached_response(url, body, meta)
+        return body
 
 # ---------- Scraper: Skift ----------
-def scrape_skift():
+async def scrape_skift(session, known_urls=None):
     """
     Scrape latest articles from Skift homepage.
 
+    Args:
+        session (aiohttp.ClientSession): Session used for the HTTP request.
+        known_urls (set): URLs already stored in the database; matching
+                          articles are skipped before any further parsing.
+
     Returns:
         list: A list of dictionaries containing 'url', 'title', 'published_at', and 'source' keys
               for each article found.
     """
     log.info("-------Scraping News Articles from Skift...-------")
     base_url = 'https://skift.com'
+    known_urls = known_urls or set()
     articles = []
 
     try:
-        resp = requests.get(base_url, headers=USER_AGENT_HEADER, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.content, 'lxml')
-        news_blocks = soup.select('article')
+        content = await fetch(session, base_url)
+        tree = LexborHTMLParser(content.decode('utf-8', 'replace'))
+        news_blocks = tree.css(SKIFT_BLOCK_SELECTOR)
+        now_str = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
 
         for item in news_blocks:
             try:
-                link_tag = item.find('a', href=True)
-                title_tag = item.find(['h2', 'h3'])
+                link_tag = item.css_first(SKIFT_LINK_SELECTOR)
+                title_tag = item.css_first(SKIFT_TITLE_SELECTOR)
 
                 if not link_tag or not title_tag:
                     continue
 
-                link = link_tag['href']
-                title = title_tag.get_text(strip=True)
-                time_tag = item.find('time')
+                link = link_tag.attributes.get('href')
+                if link in known_urls:
+                    continue
+
+                title = title_tag.text(strip=True)
+                time_tag = item.css_first(SKIFT_TIME_SELECTOR)
+                raw_dt = time_tag.attributes.get('datetime') if time_tag else None
 
-                if time_tag and time_tag.has_attr('datetime'):
+                if raw_dt:
                     try:
-                        published_at = datetime.fromisoformat(time_tag['datetime'].replace("Z", "+00:00"))
-                    except Exception:
-                        published_at = datetime.now(timezone.utc)
+                        published_at = format_iso_timestamp(raw_dt)
+                    except ValueError:
+                        published_at = now_str
                 else:
-                    published_at = datetime.now(timezone.utc)
+                    published_at = now_str
 
                 articles.append({
                     'url': link,
                     'title': title,
-                    'published_at': published_at.strftime('%Y-%m-%d %H:%M:%S'),
+                    'published_at': published_at,
                     'source': 'Skift'
                 })
             except Exception as e:
@@ -85,48 +262,58 @@ def scrape_skift():
         log.error(f"Failed to scrape Skift: {e}")
 
     log.info(f"Fetched {len(articles)} articles from Skift.")
-    for i, article in enumerate(articles, 1):
-        log.info(f"[Skift Article {i}] {article}")
+    if log.isEnabledFor(logging.DEBUG):
+        for i, article in enumerate(articles, 1):
+            log.debug(f"[Skift Article {i}] {article}")
 
     return articles
 
 # ---------- Scraper: PhocusWire ----------
-def get_phocuswire_articles():
+async def get_phocuswire_articles(session, known_urls=None):
     """
     Scrape the latest articles from the PhocusWire Latest News page.
 
+    Args:
+        session (aiohttp.ClientSession): Session used for the HTTP request.
+        known_urls (set): URLs already stored in the database; matching
+                          articles are skipped before any further parsing.
+
     Returns:
         list: A list of dictionaries with keys 'url', 'title', 'published_at', and 'source'
               for each article.
     """
     log.info("------Scraping News Articles from PhocusWire...------")
     url = "https://www.phocuswire.com/Latest-News"
+    known_urls = known_urls or set()
     articles = []
 
     try:
-        response = requests.get(url, headers=USER_AGENT_HEADER, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        articles_html = soup.select(".list-view .item")
+        content = await fetch(session, url)
+        tree = LexborHTMLParser(content.decode('utf-8', 'replace'))
+        articles_html = tree.css(PHOCUSWIRE_BLOCK_SELECTOR)
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
         for article in articles_html:
             try:
-                title_tag = article.select_one("a.title")
-                link = "https://www.phocuswire.com" + title_tag.get('href')
-                title = title_tag.text.strip()
+                title_tag = article.css_first(PHOCUSWIRE_TITLE_SELECTOR)
+                link = "https://www.phocuswire.com" + title_tag.attributes.get('href')
+                if link in known_urls:
+                    continue
+
+                title = title_tag.text(strip=True)
 
-                date_tag = article.select_one(".author")
-                raw_date = date_tag.text.split('|')[-1].strip() if date_tag else "Unknown"
+                date_tag = article.css_first(PHOCUSWIRE_DATE_SELECTOR)
+                raw_date = date_tag.text().split('|')[-1].strip() if date_tag else "Unknown"
 
                 try:
-                    published_at = datetime.strptime(raw_date, "%B %d, %Y")
+                    published_at = format_phocuswire_date(raw_date)
                 except ValueError:
-                    published_at = datetime.now()
+                    published_at = now_str
 
                 articles.append({
                     'url': link,
                     'title': title,
-                    'published_at': published_at.strftime('%Y-%m-%d %H:%M:%S'),
+                    'published_at': published_at,
                     'source': 'PhocusWire'
                 })
 
@@ -138,53 +325,113 @@ def get_phocuswire_articles():
         log.error(f"Failed to scrape PhocusWire: {e}")
 
     log.info(f"Fetched {len(articles)} articles from PhocusWire.")
-    for i, article in enumerate(articles, 1):
-        log.info(f"[PhocusWire Article {i}] {article}")
+    if log.isEnabledFor(logging.DEBUG):
+        for i, article in enumerate(articles, 1):
+            log.debug(f"[PhocusWire Article {i}] {article}")
 
     return articles
 
-# ---------- Store Articles in SQLite ----------
-def store_articles_to_db(articles, db_name=DB_FILE):
+# ---------- Database Setup ----------
+def get_db_connection(db_name=DB_FILE):
     """
-    Insert articles into a SQLite database. Skips duplicates using `INSERT OR IGNORE`.
+    Open a SQLite connection, apply the write pragmas and ensure the
+    articles table exists. Done once per run so the insert path stays hot.
 
     Args:
-        articles (list): List of dictionaries representing articles.
         db_name (str): Name of the SQLite database file (default is 'news.db').
+
+    Returns:
+        sqlite3.Connection: An open connection ready for inserts and queries.
     """
-    log.info(f"Inserting {len(articles)} articles into database...")
     conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
-
-    cursor.execute('''
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    # Memory-map the database file so reads go through the page cache
+    # instead of read() syscalls (256 MiB comfortably covers news.db).
+    conn.execute('PRAGMA mmap_size=268435456')
+    # Negative cache_size is KiB: keep up to 64 MiB of pages in memory
+    # so index updates during ingest don't thrash smaller caches.
+    conn.execute('PRAGMA cache_size=-65536')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    # The UNIQUE index on url is created after the first bulk insert
+    # (see store_articles_to_db) so initial loads don't pay per-row
+    # index maintenance.
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS articles (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT UNIQUE,
+            url TEXT,
             title TEXT,
             published_at TEXT,
             source TEXT
         )
     ''')
+    # Timestamps are normalized to 'YYYY-MM-DD HH:MM:SS', so this index
+    # serves ORDER BY published_at DESC without any datetime() calls.
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pub ON articles (published_at DESC)')
+    return conn
+
+# ---------- Fetch Known URLs ----------
+def get_known_urls(conn):
+    """
+    Load every stored article URL into a set for O(1) membership checks.
+
+    Args:
+        conn (sqlite3.Connection): Open connection from get_db_connection().
+
+    Returns:
+        set: All URLs already present in the articles table.
+    """
+    cursor = conn.execute('SELECT url FROM articles')
+    return {row[0] for row in cursor}
+
+# ---------- Store Articles in SQLite ----------
+def store_articles_to_db(articles, conn):
+    """
+    Insert articles into a SQLite database. Skips duplicates using `INSERT OR IGNORE`.
+
+    Args:
+        articles (list): List of dictionaries representing articles.
+        conn (sqlite3.Connection): Open connection from get_db_connection().
+    """
+    log.info(f"Inserting {len(articles)} articles into database...")
+    cursor = conn.cursor()
 
+    # SQLite allows at most 32766 bound variables per statement; at 4
+    # columns per row that caps each multi-row INSERT at 8191 rows.
+    chunk_size = 32766 // 4
     inserted = 0
-    for article in articles:
-        try:
-            cursor.execute('''
-                INSERT OR IGNORE INTO articles (url, title, published_at, source)
-                VALUES (?, ?, ?, ?)
-            ''', (article['url'], article['title'], article['published_at'], article['source']))
+    # Dedupe within the batch in Python: the UNIQUE index may not exist
+    # yet on a fresh database, and OR IGNORE only guards against rows
+    # already indexed.
+    seen = set()
+    rows = []
+    for a in articles:
+        if a['url'] in seen:
+            continue
+        seen.add(a['url'])
+        rows.append((a['url'], a['title'], a['published_at'], a['source']))
+    try:
+        conn.execute('BEGIN')
+        for start in range(0, len(rows), chunk_size):
+            batch = rows[start:start + chunk_size]
+            sql = ('INSERT OR IGNORE INTO articles (url, title, published_at, source) VALUES '
+                   + ','.join(['(?, ?, ?, ?)'] * len(batch)))
+            params = [value for row in batch for value in row]
+            cursor.execute(sql, params)
             inserted += cursor.rowcount
-        except Exception as e:
-            log.warning(f"Error inserting article: {e}")
+        conn.commit()
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_url ON articles (url)')
+    except Exception as e:
+        conn.rollback()
+        log.warning(f"Error inserting articles: {e}")
 
-    conn.commit()
-    conn.close()
     log.info(f"Inserted {inserted} new articles into database.")
 
 # ---------- Store Articles in CSV ----------
 def store_articles_to_csv(articles, csv_file=CSV_FILE):
     """
-    Write article data to a CSV file. Overwrites existing data.
+    Append new articles to a CSV file, keyed on URL. Rows whose URL is
+    already present are skipped so repeated runs never rewrite the file.
 
     Args:
         articles (list): List of dictionaries representing articles.
@@ -194,63 +441,93 @@ def store_articles_to_csv(articles, csv_file=CSV_FILE):
     file_exists = os.path.isfile(csv_file)
 
     try:
-        with open(csv_file, mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=['url', 'title', 'published_at', 'source'])
+        existing_urls = set()
+        if file_exists:
+            with open(csv_file, newline='', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                next(reader, None)  # skip header
+                existing_urls = {row[0] for row in reader if row}
+
+        rows = []
+        for a in articles:
+            if a['url'] in existing_urls:
+                continue
+            existing_urls.add(a['url'])
+            rows.append((a['url'], a['title'], a['published_at'], a['source']))
+
+        with open(csv_file, mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
 
             if not file_exists:
-                writer.writeheader()
+                writer.writerow(['url', 'title', 'published_at', 'source'])
 
-            for article in articles:
-                writer.writerow(article)
+            writer.writerows(rows)
 
-        log.info(f"Appended {len(articles)} articles to {csv_file}")
+        log.info(f"Appended {len(rows)} new articles to {csv_file}")
     except Exception as e:
         log.error(f"Failed to write CSV: {e}")
 
 # ---------- Fetch Top 5 Latest Articles ----------
-def get_latest_articles(db_name=DB_FILE):
+def get_latest_articles(conn):
     """
     Fetch the 5 most recent articles from the SQLite database.
 
     Args:
-        db_name (str): SQLite database file to query (default is 'news.db').
+        conn (sqlite3.Connection): Open connection from get_db_connection().
 
     Returns:
         list: List of tuples representing the latest articles with fields:
               (title, source, published_at, url)
     """
-    conn = sqlite3.connect(db_name)
     cursor = conn.cursor()
     cursor.execute('''
         SELECT title, source, published_at, url
         FROM articles
-        ORDER BY datetime(published_at) DESC
+        ORDER BY published_at DESC
         LIMIT 5
     ''')
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return cursor.fetchall()
 
 # ---------- Main Pipeline ----------
 def run_pipeline():
     """
     Run the entire news scraping and storage pipeline:
-    - Scrapes articles from Skift and PhocusWire
+    - Scrapes articles from Skift and PhocusWire concurrently
     - Stores them in both a SQLite database and a CSV file
     - Logs the top 5 latest articles
     """
     log.info("Starting news pipeline...")
 
-    skift_articles = scrape_skift()
-    phocuswire_articles = get_phocuswire_articles()
+    conn = get_db_connection()
+    known_urls = get_known_urls(conn)
+
+    async def _gather():
+        # One session with a keep-alive connector: connections are
+        # reused across requests to the same host and DNS lookups are
+        # cached for the lifetime of the run.
+        connector = aiohttp.TCPConnector(limit=10, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(connector=connector,
+                                         headers=USER_AGENT_HEADER) as session:
+            return await asyncio.gather(
+                scrape_skift(session, known_urls),
+                get_phocuswire_articles(session, known_urls)
+            )
+
+    skift_articles, phocuswire_articles = asyncio.run(_gather())
 
     all_articles = skift_articles + phocuswire_articles
-    store_articles_to_db(all_articles)
+
+    store_articles_to_db(all_articles, conn)
     store_articles_to_csv(all_articles)
 
-    latest_articles = get_latest_articles()
+    latest_articles = get_latest_articles(conn)
+    conn.close()
 
     if latest_articles:
+        # Imported here so the table formatter is only loaded when
+        # there is a table to print; it is not needed on the hot path.
+        from tabulate import tabulate
+
         log.info("\nTop 5 Latest Articles:\n")
         headers = ["Title", "Source", "Published At", "URL"]
         log.info(tabulate(latest_articles, headers=headers, tablefmt="grid"))